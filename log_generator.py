@@ -1,14 +1,17 @@
 import random
 import time
-import datetime
-import ipaddress
 import threading
-import statistics
+import queue
 import logging
 import signal
 import os
+import sys
 import yaml
 import string
+import itertools
+import struct
+import socket
+import functools
 
 # Load configuration from config.yaml
 try:
@@ -28,13 +31,26 @@ http_status_codes = config_data.get('http_status_codes', {})
 user_agent_browsers = config_data.get('user_agent_browsers', [])
 user_agent_systems = config_data.get('user_agent_systems', [])
 
+BYTES_PER_MB = 1024 * 1024
+
+# Interval between batches in write_logs; each batch carries this share of the per-second quota
+WRITE_TICK_SECONDS = 0.05
+
+# Buffer size for the log output file, large enough to coalesce batches into few write syscalls
+LOG_FILE_BUFFER_SIZE = 128 * 1024
+# Longest time written logs may sit in the file buffer before reaching the file
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+# Batches that may wait for the writer thread before producers block, bounding memory use
+LOG_WRITER_QUEUE_SIZE = 64
+
 # Configure logging
 logging_level = CONFIG.get('logging_level', 'INFO').upper()
 logging.basicConfig(level=getattr(logging, logging_level, logging.INFO),
                     format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 # Ensure required configuration parameters are present
-required_config_keys = [
+required_config_keys = frozenset({
     'duration_normal',
     'duration_peak',
     'rate_normal_min',
@@ -52,40 +68,67 @@ required_config_keys = [
     'stop_after_seconds',
     'custom_app_names',
     'custom_log_format'
-]
+})
 
-for key in required_config_keys:
-    if key not in CONFIG:
-        logging.error(f"Missing configuration parameter: {key}")
-        exit(1)
+# Report every missing parameter at once instead of stopping at the first one
+missing_config_keys = required_config_keys.difference(CONFIG)
+if missing_config_keys:
+    logger.error("Missing configuration parameters: %s", ", ".join(sorted(missing_config_keys)))
+    exit(1)
 
 # Precompute messages and templates to avoid recomputing every time
 if CONFIG['http_format_logs']:
-    # For HTTP format logs, precompute status codes and their messages
-    http_status_code_list = list(http_status_codes.keys())
-    http_messages = http_status_codes  # Already a dictionary
+    # For HTTP format logs, flatten every (status code, message) pair into a ready-made
+    # line suffix, so a line needs no status code or message lookup at all and a whole
+    # batch can be drawn with a single random.choices call. Suffixes are stored encoded so
+    # lines are assembled straight into bytes
+    http_line_suffixes = tuple(f"HTTP/1.1 {status_code} {message}".encode()
+                               for status_code, messages in http_status_codes.items()
+                               for message in messages)
+    # Weight each pair so every status code keeps the same odds as picking a code first
+    http_line_cum_weights = list(itertools.accumulate(1 / len(messages)
+                                                      for messages in http_status_codes.values()
+                                                      for _ in messages))
 else:
     # For custom format logs, create a single list of all messages
     all_messages = [msg for messages in http_status_codes.values() for msg in messages]
-    # Precompile the custom log format template
-    custom_log_template = string.Template(CONFIG['custom_log_format'])
+    # Compile the custom log format template once into a %-format, so lines are rendered
+    # without re-parsing the template. An unusable template falls back to the default format
+    try:
+        custom_log_format = string.Template(CONFIG['custom_log_format'].replace('%', '%%')).substitute(
+            timestamp='%(timestamp)s', log_level='%(log_level)s', message='%(message)s')
+    except KeyError as e:
+        logger.error("Missing key %s in custom format. Using default format.", e)
+        custom_log_format = "%(timestamp)s, %(log_level)s, %(message)s"
+    except ValueError as e:
+        logger.error("Invalid custom format: %s. Using default format.", e)
+        custom_log_format = "%(timestamp)s, %(log_level)s, %(message)s"
 
 # Create a pool of pre-generated user agents
+# Version token builders per browser, so a user agent only formats the token it uses
+user_agent_versions = {
+    "Chrome": lambda: f"Chrome/{random.randint(70, 100)}.0.{random.randint(3000, 4000)}.124",
+    "Firefox": lambda: f"Firefox/{random.randint(70, 100)}.0",
+    "Safari": lambda: f"Safari/{random.randint(605, 610)}.1.15",
+    "Edge": lambda: f"Edg/{random.randint(80, 100)}.0.{random.randint(800, 900)}.59",
+    "Opera": lambda: f"Opera/{random.randint(60, 70)}.0.{random.randint(3000, 4000)}.80",
+    "Brave": lambda: f"Chrome/{random.randint(70, 100)}.0.{random.randint(3000, 4000)}.124"  # Brave reports as Chrome
+}
+
 def generate_random_user_agent_uncached():
     """Generate a random user agent without caching."""
     browser = random.choice(user_agent_browsers)
     system = random.choice(user_agent_systems)
-    version = {
-        "Chrome": f"Chrome/{random.randint(70, 100)}.0.{random.randint(3000, 4000)}.124",
-        "Firefox": f"Firefox/{random.randint(70, 100)}.0",
-        "Safari": f"Safari/{random.randint(605, 610)}.1.15",
-        "Edge": f"Edg/{random.randint(80, 100)}.0.{random.randint(800, 900)}.59",
-        "Opera": f"Opera/{random.randint(60, 70)}.0.{random.randint(3000, 4000)}.80"
-    }
-    user_agent = f"Mozilla/5.0 ({system}) AppleWebKit/537.36 (KHTML, like Gecko) {version[browser]}"
+    version = user_agent_versions.get(browser, lambda: f"{browser}/{random.randint(1, 100)}.0")()
+    user_agent = f"Mozilla/5.0 ({system}) AppleWebKit/537.36 (KHTML, like Gecko) {version}"
     return user_agent
 
-user_agent_pool = [generate_random_user_agent_uncached() for _ in range(100)]
+# A pool size dividing 256 lets batches pick user agents with one random byte each
+user_agent_pool = [generate_random_user_agent_uncached() for _ in range(256)]
+# The quoted user agent field of an HTTP log line, encoded and ready to be joined into the line
+user_agent_fields = [f'- "{user_agent}"'.encode() for user_agent in user_agent_pool]
+# Encoded log levels for assembling HTTP log lines as bytes
+log_level_fields = [log_level.encode() for log_level in log_levels]
 
 def generate_random_user_agent():
     """Select a random user agent from the pre-generated pool."""
@@ -93,48 +136,112 @@ def generate_random_user_agent():
 
 def generate_ip_address():
     """Generate a random IP address."""
-    return str(ipaddress.IPv4Address(random.randint(0, 2**32 - 1)))
+    return socket.inet_ntoa(random.randbytes(4))
 
-def generate_log_line(http_format_logs=CONFIG['http_format_logs'],
-                      custom_app_names=CONFIG['custom_app_names']):
+def choose_batch(population, count):
     """
-    Generate a single log line with a timestamp and realistic message.
+    Pick count items uniformly at random from population.
+
+    When the population size divides 256, every pick is a single random byte used as an
+    index into the population repeated to 256 entries, so the whole batch is drawn and
+    looked up in C. Other sizes fall back to random.choices.
+    """
+    if 256 % len(population) == 0:
+        return list(map((population * (256 // len(population))).__getitem__, random.randbytes(count)))
+    return random.choices(population, k=count)
+
+def generate_ip_addresses(count, ip_format="%d.%d.%d.%d"):
+    """
+    Generate a batch of random IP addresses, unpacking the octets for all of them in one C-level pass.
+
+    Pass a bytes ip_format to get the addresses as bytes.
+    """
+    return list(map(ip_format.__mod__, struct.iter_unpack("4B", random.randbytes(4 * count))))
+
+@functools.lru_cache(maxsize=1)
+def format_timestamp_seconds(seconds):
+    """Format whole epoch seconds as an ISO 8601 date and time, cached while the second lasts."""
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+
+def generate_timestamp():
+    """Generate an ISO 8601 UTC timestamp for the current time without building a datetime object."""
+    now = time.time()
+    seconds = int(now)
+    return f"{format_timestamp_seconds(seconds)}.{int((now - seconds) * 1000000):06d}+00:00"
+
+def format_custom_log_line(timestamp, log_level, message):
+    """Render a log line with the precompiled custom log format."""
+    return custom_log_format % {'timestamp': timestamp, 'log_level': log_level, 'message': message}
+
+def generate_log_batch(count, http_format_logs=CONFIG['http_format_logs'],
+                       custom_app_names=CONFIG['custom_app_names']):
+    """
+    Generate a batch of log lines sharing a single timestamp as newline-terminated bytes.
+
+    All random fields are drawn for the whole batch at once. HTTP lines are assembled from
+    pre-encoded fields, so no per-line str is built or encoded.
 
     Args:
+        count (int): Number of log lines to generate.
         http_format_logs (bool): Whether to generate logs in HTTP format.
         custom_app_names (List[str]): List of custom application names to include in logs.
 
     Returns:
-        str: A formatted log line.
+        bytes: The encoded log lines, each followed by a newline.
     """
-    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    log_level = random.choice(log_levels)
+    timestamp = generate_timestamp()
 
     if http_format_logs:
-        ip_address = generate_ip_address()
-        user_agent = generate_random_user_agent()
-        status_code = random.choice(http_status_code_list)
-        message = random.choice(http_messages[status_code])
-        return f"{timestamp} {log_level} {ip_address} - \"{user_agent}\" HTTP/1.1 {status_code} {message}"
+        levels = choose_batch(log_level_fields, count)
+        ip_addresses = generate_ip_addresses(count, b"%d.%d.%d.%d")
+        user_agents = choose_batch(user_agent_fields, count)
+        suffixes = random.choices(http_line_suffixes, cum_weights=http_line_cum_weights, k=count)
+        # Assemble every line with bytes.join driven by map, keeping the per-line loop in C
+        log_lines = list(map(b" ".join, zip(itertools.repeat(timestamp.encode(), count),
+                                            levels, ip_addresses, user_agents, suffixes)))
+        log_lines.append(b'')  # Yields the trailing newline without copying the joined batch again
+        return b'\n'.join(log_lines)
     else:
-        message = random.choice(all_messages)
+        levels = choose_batch(log_levels, count)
+        messages = random.choices(all_messages, k=count)
 
         if custom_app_names:
-            app_name = random.choice(custom_app_names)
-            message = f"{app_name}: {message}"
+            app_names = choose_batch(custom_app_names, count)
+            messages = [f"{app_name}: {message}" for app_name, message in zip(app_names, messages)]
 
-        try:
-            return custom_log_template.substitute(
-                timestamp=timestamp,
-                log_level=log_level,
-                message=message
-            )
-        except KeyError as e:
-            logging.error(f"Missing key {e} in custom format. Using default format.")
-            return f"{timestamp}, {log_level}, {message}"
-        except Exception as e:
-            logging.error(f"Error formatting log line: {e}. Using default format.")
-            return f"{timestamp}, {log_level}, {message}"
+        log_lines = [format_custom_log_line(timestamp, log_level, message)
+                     for log_level, message in zip(levels, messages)]
+        log_lines.append('')
+        return '\n'.join(log_lines).encode()
+
+def generate_log_lines(count, http_format_logs=CONFIG['http_format_logs'],
+                       custom_app_names=CONFIG['custom_app_names']):
+    """
+    Generate a batch of log lines sharing a single timestamp.
+
+    Args:
+        count (int): Number of log lines to generate.
+        http_format_logs (bool): Whether to generate logs in HTTP format.
+        custom_app_names (List[str]): List of custom application names to include in logs.
+
+    Returns:
+        List[str]: The formatted log lines.
+    """
+    return generate_log_batch(count, http_format_logs, custom_app_names).decode().split('\n')[:-1]
+
+def generate_log_line(http_format_logs=CONFIG['http_format_logs'],
+                      custom_app_names=CONFIG['custom_app_names']):
+    """
+    Generate a single log line with a timestamp and realistic message.
+
+    Args:
+        http_format_logs (bool): Whether to generate logs in HTTP format.
+        custom_app_names (List[str]): List of custom application names to include in logs.
+
+    Returns:
+        str: A formatted log line.
+    """
+    return generate_log_lines(1, http_format_logs, custom_app_names)[0]
 
 class TokenBucket:
     def __init__(self, rate, capacity):
@@ -142,18 +249,18 @@ class TokenBucket:
         self.rate = rate  # tokens added per second
         self.capacity = capacity  # max tokens in the bucket
         self.tokens = capacity
-        self.timestamp = time.time()
+        self.timestamp_ns = time.monotonic_ns()  # integer clock, immune to wall-clock changes
         self.lock = threading.Lock()
 
     def consume(self, tokens):
         """Consume tokens from the bucket in a thread-safe manner."""
         with self.lock:
-            current_time = time.time()
-            elapsed = current_time - self.timestamp
+            current_time_ns = time.monotonic_ns()
+            elapsed = (current_time_ns - self.timestamp_ns) * 1e-9
             self.tokens += elapsed * self.rate
             if self.tokens > self.capacity:
                 self.tokens = self.capacity
-            self.timestamp = current_time
+            self.timestamp_ns = current_time_ns
 
             if self.tokens >= tokens:
                 self.tokens -= tokens
@@ -165,26 +272,36 @@ class Metrics:
         """Initialize the Metrics with default values."""
         self.total_logs = 0
         self.total_bytes = 0
-        self.rates = []
-        self.start_time = time.time()
+        # Running rate aggregates, so stats take constant time and memory however long the run
+        self.rate_count = 0
+        self.rate_sum = 0.0
+        self.max_rate = 0
+        self.min_rate = 0
+        self.start_time = time.monotonic()
         self.lock = threading.Lock()
 
-    def update(self, logs, bytes):
-        """Update the metrics with the given logs and bytes in a thread-safe manner."""
+    def update(self, logs, bytes, duration):
+        """Update the metrics with the logs and bytes written over duration seconds in a thread-safe manner."""
         with self.lock:
             self.total_logs += logs
             self.total_bytes += bytes
-            duration = time.time() - self.start_time
             if duration > 0:
-                self.rates.append(bytes / duration / 1024 / 1024)  # MB/s
+                rate = bytes / duration / BYTES_PER_MB  # MB/s
+                if self.rate_count:
+                    self.max_rate = max(self.max_rate, rate)
+                    self.min_rate = min(self.min_rate, rate)
+                else:
+                    self.max_rate = self.min_rate = rate
+                self.rate_count += 1
+                self.rate_sum += rate
 
     def get_stats(self):
         """Get the current statistics in a thread-safe manner."""
         with self.lock:
-            duration = time.time() - self.start_time
-            avg_rate = statistics.mean(self.rates) if self.rates else 0
-            max_rate = max(self.rates) if self.rates else 0
-            min_rate = min(self.rates) if self.rates else 0
+            duration = time.monotonic() - self.start_time
+            avg_rate = self.rate_sum / self.rate_count if self.rate_count else 0
+            max_rate = self.max_rate
+            min_rate = self.min_rate
         return {
             "total_logs": self.total_logs,
             "total_bytes": self.total_bytes,
@@ -197,7 +314,7 @@ class Metrics:
     def format_stats(self):
         """Format the statistics into a human-readable string with rounded numbers."""
         stats = self.get_stats()
-        total_mb = stats['total_bytes'] / (1024 * 1024)  # Convert bytes to MB
+        total_mb = stats['total_bytes'] / BYTES_PER_MB  # Convert bytes to MB
         formatted_stats = (
             f"Total Logs: {stats['total_logs']:,}, "
             f"Total Data: {total_mb:.3f} MB, "
@@ -208,109 +325,214 @@ class Metrics:
         )
         return formatted_stats
 
+def write_to_file(log_file, data):
+    """
+    Write bytes straight to the file descriptor behind log_file.
+
+    Batches are already larger than the file buffer, so this skips the text and buffered
+    I/O layers (and their locking and copying) and hands the data to os.write directly.
+    """
+    log_file.flush()  # Keep ordering with anything written through the file object
+    fd = log_file.fileno()
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
 def rotate_log_file(log_file_path):
     """Rotate the log file by renaming the current log file and creating a new one."""
     base, ext = os.path.splitext(log_file_path)
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    timestamp = time.strftime("%Y%m%d%H%M%S")
     rotated_log_file_path = f"{base}_{timestamp}{ext}"
     if os.path.exists(log_file_path):
         os.rename(log_file_path, rotated_log_file_path)
-        logging.info(f"Rotated log file to: {rotated_log_file_path}")
+        logger.info("Rotated log file to: %s", rotated_log_file_path)
     else:
-        logging.warning(f"Log file {log_file_path} does not exist. Skipping rotation.")
-    return open(log_file_path, 'w')
+        logger.warning("Log file %s does not exist. Skipping rotation.", log_file_path)
+    return open(log_file_path, 'ab', buffering=LOG_FILE_BUFFER_SIZE)
+
+def rotate_log_file_if_needed(log_file, file_size=None):
+    """
+    Rotate the log file once it reaches the configured size, returning the file to write to.
+
+    Callers that count the bytes they write can pass file_size instead of having the file
+    asked for its position. The finished file's data is synced to disk before it is closed.
+    """
+    if CONFIG['log_rotation_enabled']:
+        if file_size is None:
+            file_size = log_file.tell()
+        if file_size >= CONFIG['log_rotation_size'] * BYTES_PER_MB:
+            log_file.flush()
+            getattr(os, 'fdatasync', os.fsync)(log_file.fileno())  # fdatasync is not on every platform
+            log_file.close()
+            log_file = rotate_log_file(CONFIG['log_file_path'])
+    return log_file
+
+class AsyncLogWriter:
+    def __init__(self, log_file):
+        """Initialize the AsyncLogWriter and start a background thread writing to log_file."""
+        self.log_file = log_file
+        self.file_size = log_file.tell()  # Counted from here on, so rotation checks need no syscall
+        self.queue = queue.Queue(maxsize=LOG_WRITER_QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="AsyncLogWriter", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """
+        Write queued batches to the log file until the shutdown sentinel arrives.
+
+        Batches smaller than the file buffer are coalesced in it instead of each costing a
+        write syscall, and the buffer is flushed at least every LOG_FLUSH_INTERVAL_SECONDS
+        so readers tailing the file never fall far behind.
+        """
+        flush_deadline = time.monotonic() + LOG_FLUSH_INTERVAL_SECONDS
+        while True:
+            if self.error:
+                # Drain remaining batches after a failed write, blocking since nothing is flushed
+                if self.queue.get() is None:
+                    break
+                continue
+            try:
+                data = self.queue.get(timeout=max(flush_deadline - time.monotonic(), 0))
+            except queue.Empty:
+                data = b''  # Nothing queued before the flush deadline
+            if data is None:
+                break
+            try:
+                if data:
+                    log_file = rotate_log_file_if_needed(self.log_file, self.file_size)
+                    if log_file is not self.log_file:
+                        self.log_file = log_file
+                        self.file_size = 0
+                    if len(data) < LOG_FILE_BUFFER_SIZE:
+                        self.log_file.write(data)
+                    else:
+                        write_to_file(self.log_file, data)
+                    self.file_size += len(data)
+                if time.monotonic() >= flush_deadline:
+                    self.log_file.flush()
+                    flush_deadline = time.monotonic() + LOG_FLUSH_INTERVAL_SECONDS
+            except (IOError, OSError) as e:
+                self.error = e
+
+    def submit(self, data):
+        """
+        Queue a batch of encoded log data, raising any error hit by the writer thread.
+
+        Blocks while the queue is full, so a slow disk throttles generation instead of
+        letting pending batches pile up in memory.
+        """
+        if self.error:
+            raise self.error
+        self.queue.put(data)
+
+    def close(self):
+        """Wait for queued batches to be written, then close the current log file."""
+        self.queue.put(None)
+        self.thread.join()
+        self.log_file.close()
+        if self.error:
+            raise self.error
 
 def write_logs(rate, duration, log_file=None,
                http_format_logs=CONFIG['http_format_logs'],
                custom_app_names=CONFIG['custom_app_names'],
                metrics=None):
-    logging.info(f"Writing logs at rate: {rate:.4f} MB/s for {duration:.2f} seconds")
-    tokens_per_second = rate * 1024 * 1024 / CONFIG['log_line_size']
-    token_bucket = TokenBucket(tokens_per_second, tokens_per_second)
-    end_time = time.time() + duration
+    """
+    Write logs at a fixed rate for a given duration.
+
+    Every tick emits that tick's share of the per-second line quota as one batch, then
+    sleeps until the next tick's deadline. Deadlines advance by a fixed step, so time spent
+    generating and writing is absorbed instead of accumulating as drift. The last tick only
+    covers the time left, and the loop stops on the clock, so a call that cannot keep up
+    drops the ticks it missed rather than running past its duration.
+    """
+    logger.info("Writing logs at rate: %.4f MB/s for %.2f seconds", rate, duration)
+    lines_per_second = rate * BYTES_PER_MB / CONFIG['log_line_size']
     logs_written = 0
     bytes_written = 0
-
-    # Initial batch size
-    batch_size = 1024
-    log_lines = []
-    expected_batch_time = batch_size / tokens_per_second
-
-    # Introduce a variable to track time spent sleeping
-    total_sleep_time = 0
-
-    while time.time() < end_time:
-        start_time = time.time()
-
-        # Ensure batch_size is an integer
-        batch_size = int(batch_size)
-
-        if token_bucket.consume(batch_size):  # Check if we can write `batch_size` logs
-            for _ in range(batch_size):
-                log_line = generate_log_line(http_format_logs, custom_app_names)
-                log_lines.append(log_line)
-                logs_written += 1
-                bytes_written += len(log_line) + 1  # +1 for newline
-
-            if log_file:
-                if CONFIG['log_rotation_enabled'] and log_file.tell() >= CONFIG['log_rotation_size'] * 1024 * 1024:
-                    log_file.close()
-                    log_file = rotate_log_file(CONFIG['log_file_path'])
-                log_file.write('\n'.join(log_lines) + '\n')
-                log_file.flush()
-            else:
-                print('\n'.join(log_lines))
-
-            log_lines.clear()
-
-            # Calculate the time taken to process this batch
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0, expected_batch_time - elapsed_time)
-
-            # Aggressive batch size adjustment based on sleep time
-            if sleep_time > 0:
-                total_sleep_time += sleep_time
-                # If we're spending too much time sleeping, increase the batch size
-                # Increase batch size by 20% if sleep time is significant
-                if total_sleep_time > 0.05:  # Adjust this threshold as needed
-                    batch_size = min(batch_size * 1.2, tokens_per_second)  # Ensure we don’t exceed the rate
-                    total_sleep_time = 0  # Reset the sleep tracker
-                    logging.info(f"Increasing batch size to: {int(batch_size)}")
+    pending_lines = 0.0  # Fractional lines carried over so low rates still emit over time
+
+    # Console output goes straight to stdout's binary buffer, skipping the text layer, unless
+    # stdout was replaced by a text-only stream (redirect_stdout, some IDE consoles)
+    stdout = getattr(sys.stdout, 'buffer', None) if log_file is None else None
+
+    # Bind the calls made on every iteration to locals instead of resolving them each time
+    monotonic = time.monotonic
+    sleep = time.sleep
+
+    start_time = deadline = now = monotonic()
+    end_time = start_time + duration
+
+    while now < end_time:
+        tick = min(WRITE_TICK_SECONDS, end_time - deadline)
+        pending_lines += lines_per_second * tick
+        batch_size = int(pending_lines)
+        pending_lines -= batch_size
+
+        if batch_size:
+            # The whole batch arrives encoded so it goes out in a single binary write
+            log_data = generate_log_batch(batch_size, http_format_logs, custom_app_names)
+            logs_written += batch_size
+            bytes_written += len(log_data)
+
+            if isinstance(log_file, AsyncLogWriter):
+                log_file.submit(log_data)
+            elif log_file:
+                log_file = rotate_log_file_if_needed(log_file)
+                write_to_file(log_file, log_data)
+            elif stdout:
+                stdout.write(log_data)
             else:
-                # If not sleeping, increase batch size more aggressively
-                batch_size = min(batch_size * 1.5, tokens_per_second)
-                logging.info(f"Rapidly increasing batch size to: {int(batch_size)}")
-
-            # Sleep if necessary
-            time.sleep(sleep_time)
+                sys.stdout.write(log_data.decode())
 
+        deadline += tick
+        now = monotonic()
+        if now < deadline:
+            sleep(deadline - now)
+            now = deadline  # sleep() returns no earlier than the deadline, so skip another clock read
         else:
-            time.sleep(0.05)  # Sleep for a short time if no tokens are available
+            deadline = now  # Running behind: skip the missed ticks instead of replaying them back to back
 
     if metrics:
-        metrics.update(logs_written, bytes_written)
+        metrics.update(logs_written, bytes_written, monotonic() - start_time)
 
     return log_file
 
+def plan_rate_segments(duration, rate_min, rate_max):
+    """
+    Draw the whole schedule of random-rate segments for a period up front.
+
+    Returns:
+        List[Tuple[float, float]]: (rate in MB/s, duration in seconds) for each segment.
+    """
+    segments = []
+    remaining_time = duration
+    while remaining_time > 0:
+        segment_duration = random.uniform(1, remaining_time)
+        segments.append((random.uniform(rate_min, rate_max), segment_duration))
+        remaining_time -= segment_duration
+    return segments
+
 def write_logs_random_rate(duration, rate_min, rate_max, log_file=None,
                            http_format_logs=CONFIG['http_format_logs'],
                            custom_app_names=CONFIG['custom_app_names'],
                            metrics=None):
-    """Write logs at a random rate between rate_min and rate_max for a given duration using the token bucket algorithm."""
-    end_time = time.time() + duration
-    remaining_time = duration
+    """Write logs at a random rate between rate_min and rate_max for a given duration, one planned segment at a time."""
+    deadline = time.monotonic() + duration
 
     if random.random() < CONFIG['rate_change_probability']:
         change_percentage = random.uniform(-CONFIG['rate_change_max_percentage'], CONFIG['rate_change_max_percentage'])
         rate_max *= (1 + change_percentage)
-        logging.info(f"Changing rate_max by {change_percentage*100:.2f}%, new rate_max: {rate_max:.4f} MB/s")
-
-    while remaining_time > 0:
-        segment_duration = random.uniform(1, remaining_time)
-        rate = random.uniform(rate_min, rate_max)
-        logging.info(f"Selected random rate: {rate:.4f} MB/s")
+        logger.info("Changing rate_max by %.2f%%, new rate_max: %.4f MB/s", change_percentage * 100, rate_max)
+
+    for rate, segment_duration in plan_rate_segments(duration, rate_min, rate_max):
+        # Clamp to the deadline so time spent outside write_logs does not stretch the period
+        segment_duration = min(segment_duration, deadline - time.monotonic())
+        if segment_duration <= 0:
+            break
+        logger.info("Selected random rate: %.4f MB/s", rate)
         log_file = write_logs(rate, segment_duration, log_file, http_format_logs, custom_app_names, metrics)
-        remaining_time -= segment_duration
 
     return log_file
 
@@ -319,12 +541,12 @@ def write_logs_random_segments(total_duration, segment_max_duration, rate_min, r
                                http_format_logs=CONFIG['http_format_logs'],
                                custom_app_names=CONFIG['custom_app_names'],
                                metrics=None):
-    """Write logs in random segments with a chance to exit early using the token bucket algorithm."""
+    """Write logs in random segments with a chance to exit early before each segment."""
     remaining_time = total_duration
     while remaining_time > 0:
         exit_probability = base_exit_probability * random.uniform(0.5, 1.5)  # Add variability to the exit probability
         if random.random() < exit_probability:
-            logging.info("Exiting early based on random exit clause.")
+            logger.info("Exiting early based on random exit clause.")
             return log_file
         segment_duration = random.uniform(1, min(segment_max_duration, remaining_time))
         log_file = write_logs_random_rate(segment_duration, rate_min, rate_max, log_file,
@@ -335,20 +557,19 @@ def write_logs_random_segments(total_duration, segment_max_duration, rate_min, r
 
 def main(config, metrics_instance=None):
     """Main function to initiate log writing based on configuration."""
-    start_time = time.time()
+    start_time = time.monotonic()
     iteration = 0
 
     if metrics_instance is None:
         metrics_instance = Metrics()
 
-    interrupted = False  # Flag to indicate if an interrupt was received
+    interrupted = threading.Event()  # Set once an interrupt was received
 
     def handle_interrupt(signal_received, frame):
         """Handle interrupt signals to ensure proper cleanup."""
-        nonlocal interrupted
-        interrupted = True
-        logging.info("Interrupt received, shutting down...")
-        logging.info(f"Final metrics: {metrics_instance.format_stats()}")
+        interrupted.set()
+        logger.info("Interrupt received, shutting down...")
+        logger.info("Final metrics: %s", metrics_instance.format_stats())
         exit(0)
 
     signal.signal(signal.SIGINT, handle_interrupt)
@@ -356,39 +577,46 @@ def main(config, metrics_instance=None):
 
     if config['write_to_file']:
         try:
-            with open(config['log_file_path'], 'a') as log_file:
-                while config['stop_after_seconds'] == -1 or time.time() - start_time < config['stop_after_seconds']:
-                    log_file = write_logs_random_segments(
-                        config['duration_normal'],
-                        5,
-                        config['rate_normal_min'],
-                        config['rate_normal_max'],
-                        config['base_exit_probability'],
-                        log_file,
-                        config['http_format_logs'],
-                        config['custom_app_names'],
-                        metrics_instance
-                    )
-                    log_file = write_logs_random_rate(
-                        config['duration_peak'],
-                        config['rate_normal_max'],
-                        config['rate_peak'],
-                        log_file,
-                        config['http_format_logs'],
-                        config['custom_app_names'],
-                        metrics_instance
-                    )
-
-                    iteration += 1
-                    logging.info(f"Iteration {iteration} metrics: {metrics_instance.format_stats()}")
+            with open(config['log_file_path'], 'ab', buffering=LOG_FILE_BUFFER_SIZE) as log_file:
+                # Hand batches to a background thread so generation overlaps with disk writes
+                log_writer = AsyncLogWriter(log_file)
+                try:
+                    while config['stop_after_seconds'] == -1 or time.monotonic() - start_time < config['stop_after_seconds']:
+                        write_logs_random_segments(
+                            config['duration_normal'],
+                            5,
+                            config['rate_normal_min'],
+                            config['rate_normal_max'],
+                            config['base_exit_probability'],
+                            log_writer,
+                            config['http_format_logs'],
+                            config['custom_app_names'],
+                            metrics_instance
+                        )
+                        write_logs_random_rate(
+                            config['duration_peak'],
+                            config['rate_normal_max'],
+                            config['rate_peak'],
+                            log_writer,
+                            config['http_format_logs'],
+                            config['custom_app_names'],
+                            metrics_instance
+                        )
+
+                        iteration += 1
+                        if logger.isEnabledFor(logging.INFO):  # Skip building the stats string when INFO is off
+                            logger.info("Iteration %d metrics: %s", iteration, metrics_instance.format_stats())
+                finally:
+                    # Drain queued batches before the file is closed
+                    log_writer.close()
         except (IOError, OSError) as e:
-            logging.error(f"Error opening or writing to file: {e}")
+            logger.error("Error opening or writing to file: %s", e)
         finally:
-            if not interrupted:
-                logging.info(f"Final metrics: {metrics_instance.format_stats()}")
+            if not interrupted.is_set():
+                logger.info("Final metrics: %s", metrics_instance.format_stats())
     else:
         try:
-            while config['stop_after_seconds'] == -1 or time.time() - start_time < config['stop_after_seconds']:
+            while config['stop_after_seconds'] == -1 or time.monotonic() - start_time < config['stop_after_seconds']:
                 write_logs_random_segments(
                     config['duration_normal'],
                     5,
@@ -411,12 +639,13 @@ def main(config, metrics_instance=None):
                 )
 
                 iteration += 1
-                logging.info(f"Iteration {iteration} metrics: {metrics_instance.format_stats()}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Iteration %d metrics: %s", iteration, metrics_instance.format_stats())
         except Exception as e:
-            logging.error(f"An error occurred during log generation: {e}")
+            logger.error("An error occurred during log generation: %s", e)
         finally:
-            if not interrupted:
-                logging.info(f"Final metrics: {metrics_instance.format_stats()}")
+            if not interrupted.is_set():
+                logger.info("Final metrics: %s", metrics_instance.format_stats())
 
 if __name__ == "__main__":
     main(CONFIG)
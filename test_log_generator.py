@@ -1,12 +1,18 @@
 import time
+import datetime
 import ipaddress
 import random
 import tempfile
+import io
+import contextlib
 import os
+from unittest import mock
 from log_generator import (
-    generate_log_line, write_logs, write_logs_random_rate,
+    generate_log_line, generate_log_lines, generate_log_batch, write_logs, write_logs_random_rate,
     write_logs_random_segments, main, generate_random_user_agent,
-    generate_ip_address, Metrics
+    generate_ip_address, generate_ip_addresses, choose_batch, generate_timestamp, Metrics,
+    AsyncLogWriter, plan_rate_segments, TokenBucket, LOG_FLUSH_INTERVAL_SECONDS,
+    rotate_log_file_if_needed, CONFIG
 )
 
 # Test configuration
@@ -39,6 +45,27 @@ def test_generate_log_line():
     assert len(log_line) > 0
     print(f"Generated log line: {log_line}")
 
+def test_generate_log_lines():
+    log_lines = generate_log_lines(
+        50,
+        http_format_logs=test_config['http_format_logs'],
+        custom_app_names=test_config['custom_app_names']
+    )
+    assert len(log_lines) == 50
+    assert all(isinstance(log_line, str) and "HTTP/1.1" in log_line for log_line in log_lines)
+    print(f"Generated {len(log_lines)} log lines")
+
+def test_generate_log_batch():
+    log_data = generate_log_batch(
+        50,
+        http_format_logs=test_config['http_format_logs'],
+        custom_app_names=test_config['custom_app_names']
+    )
+    assert isinstance(log_data, bytes)
+    assert log_data.endswith(b"\n")
+    assert log_data.count(b"\n") == 50
+    print(f"Generated a batch of {len(log_data)} bytes")
+
 def test_generate_random_user_agent():
     user_agent = generate_random_user_agent()
     assert isinstance(user_agent, str)
@@ -51,6 +78,44 @@ def test_generate_ip_address():
     assert ipaddress.ip_address(ip_address)
     print(f"Generated IP address: {ip_address}")
 
+def test_choose_batch():
+    for population in (['A', 'B', 'C', 'D'], ['A', 'B', 'C']):
+        picks = choose_batch(population, 1000)
+        assert len(picks) == 1000
+        assert set(picks) == set(population)
+    print("Batch choice test passed")
+
+def test_generate_ip_addresses():
+    ip_addresses = generate_ip_addresses(100)
+    assert len(ip_addresses) == 100
+    assert all(ipaddress.ip_address(ip_address) for ip_address in ip_addresses)
+    print(f"Generated {len(ip_addresses)} IP addresses")
+
+def test_generate_timestamp():
+    timestamp = generate_timestamp()
+    parsed = datetime.datetime.fromisoformat(timestamp)
+    assert parsed.utcoffset() == datetime.timedelta(0)
+    assert abs(datetime.datetime.now(datetime.timezone.utc) - parsed) < datetime.timedelta(seconds=5)
+    print(f"Generated timestamp: {timestamp}")
+
+def test_token_bucket():
+    token_bucket = TokenBucket(rate=1, capacity=10)  # A slow refill keeps the test independent of timing
+    assert token_bucket.consume(10)
+    assert not token_bucket.consume(10)
+    print("Token bucket test passed")
+
+def test_metrics():
+    metrics_instance = Metrics()
+    assert metrics_instance.get_stats()['avg_rate_mb_s'] == 0
+    metrics_instance.update(10, 1024 * 1024, 1)
+    metrics_instance.update(10, 6 * 1024 * 1024, 2)
+    stats = metrics_instance.get_stats()
+    assert stats['total_logs'] == 20
+    assert stats['min_rate_mb_s'] == 1
+    assert stats['max_rate_mb_s'] == 3
+    assert stats['avg_rate_mb_s'] == 2
+    print(f"Metrics test passed: {metrics_instance.format_stats()}")
+
 def test_write_logs():
     with tempfile.TemporaryDirectory() as tmp_dir:
         log_file_path = os.path.join(tmp_dir, "test_logs.txt")
@@ -65,6 +130,107 @@ def test_write_logs():
         assert os.path.getsize(log_file_path) > 0
         print(f"Logs written to {log_file_path}")
 
+def test_write_logs_text_stdout():
+    console = io.StringIO()  # A text-only stream without a binary buffer
+    metrics_instance = Metrics()
+    with contextlib.redirect_stdout(console):
+        write_logs(0.01, 0.1, metrics=metrics_instance)
+    assert metrics_instance.total_logs > 0
+    assert console.getvalue().count("\n") == metrics_instance.total_logs
+    print("Write logs to text stdout test passed")
+
+def test_write_logs_duration():
+    # Drive write_logs from a fake clock, so timing on a busy machine cannot affect the result
+    clock = [1000.0]
+
+    def fake_sleep(seconds):
+        clock[0] += seconds
+
+    def stalled_generate_log_batch(*args):
+        if not stalled:
+            stalled.append(True)
+            clock[0] += 0.2  # One slow batch, far longer than a tick
+        return generate_log_batch(*args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            mock.patch('time.monotonic', lambda: clock[0]), mock.patch('time.sleep', fake_sleep):
+        log_file_path = os.path.join(tmp_dir, "test_logs_duration.txt")
+        for duration in (0.01, 0.3):  # Shorter than one tick, then several ticks
+            metrics_instance = Metrics()
+            start_time = clock[0]
+            with open(log_file_path, 'wb') as log_file:
+                write_logs(1, duration, log_file, metrics=metrics_instance)
+            expected_logs = 1024 * 1024 / CONFIG['log_line_size'] * duration
+            assert abs(clock[0] - start_time - duration) < 1e-9
+            assert abs(metrics_instance.total_logs - expected_logs) <= 1
+
+        # A stalled batch drops the ticks it missed instead of running past the duration
+        stalled = []
+        metrics_instance = Metrics()
+        start_time = clock[0]
+        with open(log_file_path, 'wb') as log_file, \
+                mock.patch('log_generator.generate_log_batch', stalled_generate_log_batch):
+            write_logs(1, 0.3, log_file, metrics=metrics_instance)
+        assert abs(clock[0] - start_time - 0.3) < 1e-9
+        assert metrics_instance.total_logs < 1024 * 1024 / CONFIG['log_line_size'] * 0.3
+    print("Write logs duration test passed")
+
+def test_rotate_log_file_if_needed():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file_path = os.path.join(tmp_dir, "test_rotation.txt")
+        saved_config = dict(CONFIG)
+        CONFIG.update(log_rotation_enabled=True, log_rotation_size=1, log_file_path=log_file_path)
+        try:
+            log_file = open(log_file_path, 'ab')
+            log_file.write(b"rotated line\n")
+            assert rotate_log_file_if_needed(log_file, file_size=100) is log_file
+            rotated_file = rotate_log_file_if_needed(log_file, file_size=1024 * 1024)
+            assert rotated_file is not log_file and log_file.closed
+            rotated_file.close()
+        finally:
+            CONFIG.clear()
+            CONFIG.update(saved_config)
+        assert os.path.getsize(log_file_path) == 0
+        assert len(os.listdir(tmp_dir)) == 2
+        print("Log rotation test passed")
+
+def test_async_log_writer():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file_path = os.path.join(tmp_dir, "test_async_logs.txt")
+        log_writer = AsyncLogWriter(open(log_file_path, 'wb'))
+        for i in range(100):
+            log_writer.submit(f"line {i}\n".encode())
+        time.sleep(LOG_FLUSH_INTERVAL_SECONDS + 0.5)
+        assert os.path.getsize(log_file_path) > 0  # Buffered batches are flushed without closing
+        log_writer.close()
+        with open(log_file_path) as log_file:
+            assert log_file.read().splitlines() == [f"line {i}" for i in range(100)]
+        print(f"Async logs written to {log_file_path}")
+
+def test_async_log_writer_error():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file_path = os.path.join(tmp_dir, "test_async_error_logs.txt")
+        open(log_file_path, 'wb').close()
+        log_writer = AsyncLogWriter(open(log_file_path, 'rb'))  # Every write fails
+        log_writer.submit(b"line\n")
+        cpu_start = time.process_time()
+        time.sleep(LOG_FLUSH_INTERVAL_SECONDS + 0.5)  # Idle past the first flush deadline
+        assert time.process_time() - cpu_start < 0.25  # The failed writer waits instead of spinning
+        try:
+            log_writer.close()
+        except OSError:
+            pass
+        else:
+            assert False, "close() should raise the write error"
+        print("Async log writer error test passed")
+
+def test_plan_rate_segments():
+    segments = plan_rate_segments(10, test_config['rate_normal_min'], test_config['rate_normal_max'])
+    assert segments
+    assert all(test_config['rate_normal_min'] <= rate <= test_config['rate_normal_max'] for rate, _ in segments)
+    assert sum(duration for _, duration in segments) >= 10
+    print(f"Planned {len(segments)} rate segments")
+
 def test_write_logs_random_rate():
     with tempfile.TemporaryDirectory() as tmp_dir:
         log_file_path = os.path.join(tmp_dir, "test_logs_random_rate.txt")
@@ -134,9 +300,22 @@ def test_exit_early():
 if __name__ == "__main__":
     # Run all tests
     test_generate_log_line()
+    test_generate_log_lines()
+    test_generate_log_batch()
     test_generate_random_user_agent()
     test_generate_ip_address()
+    test_choose_batch()
+    test_generate_ip_addresses()
+    test_generate_timestamp()
+    test_token_bucket()
+    test_metrics()
     test_write_logs()
+    test_write_logs_text_stdout()
+    test_write_logs_duration()
+    test_rotate_log_file_if_needed()
+    test_async_log_writer()
+    test_async_log_writer_error()
+    test_plan_rate_segments()
     test_write_logs_random_rate()
     test_write_logs_random_segments()
     test_main()